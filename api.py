@@ -3,11 +3,17 @@ FastAPI Server for Agentic RAG
 Provides OpenAI-compatible API endpoints for integration with OpenWebUI and other clients.
 Compatible with Windows, macOS, and Linux.
 """
+import asyncio
+import hashlib
+import json
+import math
 import os
+import random
+import re
 import sys
 import time
-import uuid
 import logging
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -16,10 +22,13 @@ from datetime import datetime
 project_root = Path(__file__).parent.resolve()
 sys.path.insert(0, str(project_root))
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
-from pydantic import BaseModel, Field
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError
+import httpx
+import orjson
 import uvicorn
 
 # Import RAG components
@@ -37,20 +46,441 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Agentic RAG API",
     description="OpenAI-compatible API for Agentic RAG with CrewAI",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson serializes straight to bytes several times faster than the
+    # stdlib encoder, which matters most for the embeddings payload
+    default_response_class=ORJSONResponse
 )
 
-# Add CORS middleware for web interface access
+# Add CORS middleware for web interface access. A fixed origin allowlist
+# (comma-separated ALLOWED_ORIGINS) lets Starlette answer preflights with
+# constant headers instead of reflecting the Origin per request, and a
+# wildcard combined with credentials is unsafe anyway. Defaults to the
+# local OpenWebUI instance.
+_allowed_origins = [
+    origin.strip()
+    for origin in os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
+    if origin.strip()
+]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure specific origins in production
+    allow_origins=_allowed_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
-# Initialize RAG manager
-rag_manager = RAGCrewManager(use_simple_mode=False)
+# Compress JSON bodies for clients that accept gzip (OpenWebUI does).
+# Level 5 keeps CPU cost low while still cutting long answers ~70%;
+# bodies under the threshold are not worth the header overhead. Relies
+# on starlette>=0.38 (pinned in requirements) exempting text/event-stream
+# responses - older releases gzip streaming bodies regardless of size,
+# and zlib buffering would hold back the small SSE token batches.
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
+# Shared RAG managers, built lazily and memoized per mode. Building a
+# RAGCrewManager wires up CrewAI agents, tools and the vector store
+# handle - far too expensive to repeat per request, but also too heavy
+# to pay at import in processes that never serve: with the "api:app"
+# import string the `python api.py` process is only uvicorn's supervisor,
+# and workers re-import this module themselves.
+_managers: Dict[bool, RAGCrewManager] = {}
+
+
+def _get_manager(simple: bool) -> RAGCrewManager:
+    """Return the shared manager for a mode, constructing it on first use"""
+    manager = _managers.get(simple)
+    if manager is None:
+        manager = _managers[simple] = RAGCrewManager(use_simple_mode=simple)
+    return manager
+
+
+class ExactCache:
+    """
+    LRU mapping exact (model, stripped query) pairs to completed
+    (answer, sources, prefix_cache_hit) results.
+
+    Hand-rolled over an OrderedDict rather than functools.lru_cache so
+    the hot path can peek for a hit without a miss triggering the full
+    pipeline run - an exact repeat must stay sub-millisecond and never
+    wait on the embedding service the semantic cache needs.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, model: str, query: str):
+        """Return the cached result or None, updating recency and counters"""
+        key = (model, query)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, model: str, query: str, entry):
+        """Store a completed result, evicting the least recently used"""
+        key = (model, query)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SemanticCache:
+    """
+    Embedding-similarity cache for near-duplicate queries.
+
+    Paraphrased queries ("what is the HR policy?" vs "tell me about HR
+    policies") miss an exact-match cache but land close together in
+    embedding space. Candidate lookup uses random-hyperplane LSH
+    (num_tables hash tables of num_hyperplanes sign bits each) so a probe
+    only scores entries sharing at least one bucket, then confirms with
+    exact cosine similarity against the threshold.
+
+    Bounded at maxsize entries with FIFO eviction so a long-running
+    server does not pin embeddings and answers forever. Bucket lists keep
+    a stale id after an eviction (lookup skips it) and are rebuilt from
+    stored signatures once stale ids would outnumber live entries.
+    """
+
+    def __init__(self, dimension: int = 768, num_tables: int = 8,
+                 num_hyperplanes: int = 16, threshold: float = 0.95,
+                 maxsize: int = 1024):
+        self.dimension = dimension
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # Fixed seed so bucket assignments are stable across restarts
+        rng = random.Random(42)
+        self._hyperplanes = [
+            [[rng.gauss(0.0, 1.0) for _ in range(dimension)]
+             for _ in range(num_hyperplanes)]
+            for _ in range(num_tables)
+        ]
+        self._tables = [{} for _ in range(num_tables)]
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._stale_refs = 0
+
+    def embed(self, text: str) -> List[float]:
+        """Embed text with the same Ollama model the RAG system uses"""
+        response = httpx.post(
+            f"{settings.ollama.base_url}/api/embeddings",
+            json={"model": "nomic-embed-text", "prompt": text},
+            timeout=30.0
+        )
+        response.raise_for_status()
+        return response.json()["embedding"]
+
+    def _signature(self, table: int, embedding: List[float]) -> int:
+        bits = 0
+        for hyperplane in self._hyperplanes[table]:
+            bits <<= 1
+            if sum(h * e for h, e in zip(hyperplane, embedding)) >= 0.0:
+                bits |= 1
+        return bits
+
+    @staticmethod
+    def _cosine(a: List[float], b: List[float]) -> float:
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+
+    def lookup(self, embedding: List[float], model: str):
+        """Return cached (answer, sources) if a similar query exists, else None"""
+        candidates = set()
+        for table in range(len(self._tables)):
+            bucket = self._tables[table].get(self._signature(table, embedding))
+            if bucket:
+                candidates.update(bucket)
+
+        best_sim = 0.0
+        best_entry = None
+        for entry_id in candidates:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                # Evicted entry; its bucket reference is stale
+                continue
+            entry_embedding, entry_model, answer, sources, _ = entry
+            if entry_model != model:
+                continue
+            similarity = self._cosine(embedding, entry_embedding)
+            if similarity > best_sim:
+                best_sim = similarity
+                best_entry = (answer, sources)
+
+        if best_entry is not None and best_sim >= self.threshold:
+            self.hits += 1
+            return best_entry
+
+        self.misses += 1
+        return None
+
+    def insert(self, embedding: List[float], model: str, answer: str, sources):
+        """Store an answered query, evicting the oldest entry when full"""
+        signatures = tuple(
+            self._signature(table, embedding)
+            for table in range(len(self._tables))
+        )
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (
+            embedding, model, answer, tuple(sources), signatures
+        )
+        for table, signature in enumerate(signatures):
+            self._tables[table].setdefault(signature, []).append(entry_id)
+
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._stale_refs += 1
+            if self._stale_refs >= self.maxsize:
+                self._rebuild_tables()
+
+    def _rebuild_tables(self):
+        """Re-bucket live entries from their stored signatures"""
+        self._tables = [{} for _ in self._tables]
+        for entry_id, entry in self._entries.items():
+            for table, signature in enumerate(entry[4]):
+                self._tables[table].setdefault(signature, []).append(entry_id)
+        self._stale_refs = 0
+
+    def clear(self):
+        """Drop all cached entries (hit counters are preserved)"""
+        self._tables = [{} for _ in self._tables]
+        self._entries = OrderedDict()
+        self._stale_refs = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+# Caches shared by all requests. Call /v1/cache/clear after re-ingesting
+# documents so stale answers are not served.
+exact_cache = ExactCache()
+semantic_cache = SemanticCache()
+
+# Cross-worker cache invalidation. With multiple worker processes each
+# worker holds private caches, so /v1/cache/clear on one worker records
+# the clear by touching this file; every worker compares its mtime before
+# serving from cache and flushes when a sibling has signalled a clear.
+_CACHE_VERSION_FILE = project_root / ".cache_version"
+
+
+def _cache_version() -> float:
+    try:
+        return _CACHE_VERSION_FILE.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+_cache_version_seen = _cache_version()
+
+
+def _check_cache_version():
+    """Flush local caches if another worker cleared since the last check"""
+    global _cache_version_seen
+    version = _cache_version()
+    if version != _cache_version_seen:
+        _cache_version_seen = version
+        exact_cache.clear()
+        semantic_cache.clear()
+
+
+def _run_query(model: str, query: str):
+    """
+    Run a query through the full RAG pipeline.
+    Failed queries raise instead of returning so callers never cache them.
+    """
+    manager = _get_manager(model == "simple-rag")
+    result = manager.query(query)
+
+    if not result.get("success", False):
+        raise RuntimeError(result.get("error", "Unknown error"))
+
+    # prefix_cache_hit is reported by manager backends that reuse
+    # precomputed KV state for the system-prompt/chunk prefix; absent
+    # until the manager grows that support
+    return (
+        result.get("answer", ""),
+        tuple(result.get("sources", [])),
+        bool(result.get("prefix_cache_hit", False))
+    )
+
+
+async def _resolve_answer(model: str, query: str):
+    """
+    Produce (answer, sources, prefix_cache_hit) for a query, trying the
+    exact-match cache, then the semantic cache, then the full pipeline.
+
+    The free in-memory exact probe comes first: repeat queries must stay
+    sub-millisecond and never depend on the embedding service, which is
+    only consulted once an exact miss makes a similarity probe worth it.
+    """
+    _check_cache_version()
+
+    key = query.strip()
+    exact = exact_cache.get(model, key)
+    if exact is not None:
+        # Deliberately replays the prefix_cache_hit recorded when the
+        # entry was filled: an exact hit skips generation entirely, so
+        # the header describes the generation that produced this answer
+        return exact
+
+    embedding = None
+    cached = None
+    try:
+        embedding = await asyncio.to_thread(semantic_cache.embed, query)
+        cached = await asyncio.to_thread(
+            semantic_cache.lookup, embedding, model
+        )
+    except Exception as e:
+        logger.warning(f"Semantic cache unavailable: {e}")
+
+    if cached is not None:
+        answer, sources = cached
+        return answer, sources, False
+
+    try:
+        answer, sources, prefix_hit = await asyncio.to_thread(
+            _run_query, model, key
+        )
+    except RuntimeError as e:
+        logger.error(f"Query failed: {e}")
+        return "Failed to process query", (), False
+
+    exact_cache.put(model, key, (answer, sources, prefix_hit))
+    if embedding is not None:
+        # insert recomputes the LSH signatures (pure-Python dot products),
+        # so it stays off the loop like embed and lookup above
+        await asyncio.to_thread(
+            semantic_cache.insert, embedding, model, answer, sources
+        )
+
+    return answer, sources, prefix_hit
+
+
+def _format_answer(answer: str, sources) -> str:
+    """Append source attribution to an answer if any sources are known"""
+    if sources:
+        return answer + f"\n\n**Sources:** {', '.join(sources)}"
+    return answer
+
+
+# Characters per streamed chunk when the manager has no native token stream
+_STREAM_CHUNK_CHARS = 24
+
+# Streamed tokens are coalesced before each SSE emit to cut per-chunk
+# framing overhead. The batch starts small so time-to-first-token stays
+# low, then grows by the configured factor on every flush up to the cap.
+# A flush also happens whenever no new token arrives within the interval.
+_STREAM_BATCH_SIZE = max(1, int(os.getenv("DEFAULT_BATCH_SIZE", "1")))
+_STREAM_BATCH_GROWTH = max(1, int(os.getenv("DEFAULT_BATCH_SIZE_GROWTH_FACTOR", "3")))
+_STREAM_MAX_BATCH_SIZE = 16
+_STREAM_FLUSH_INTERVAL = 0.05  # seconds
+
+
+async def _stream_chat_completion(model: str, query: str):
+    """
+    Async generator yielding OpenAI-style SSE chat completion chunks.
+
+    Must stay an async generator: a sync generator would be driven through
+    the threadpool by Starlette, which is dramatically slower. If the
+    manager grows a native `query_stream` async iterator its tokens are
+    relayed as they arrive; until then the resolved answer is sliced into
+    small chunks so clients still render progressively.
+    """
+    completion_id = f"chatcmpl-{os.urandom(4).hex()}"
+    created = int(time.time())
+
+    def _chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [
+                {"delta": delta, "index": 0, "finish_reason": finish_reason}
+            ]
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    yield _chunk({"role": "assistant"})
+
+    # First use may construct the manager, so keep it off the loop
+    manager = await asyncio.to_thread(_get_manager, model == "simple-rag")
+    query_stream = getattr(manager, "query_stream", None)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def _produce():
+        try:
+            if query_stream is not None:
+                async for token in query_stream(query):
+                    await queue.put(token)
+            else:
+                answer, sources, _ = await _resolve_answer(model, query)
+                answer = _format_answer(answer, sources)
+                for start in range(0, len(answer), _STREAM_CHUNK_CHARS):
+                    await queue.put(answer[start:start + _STREAM_CHUNK_CHARS])
+        except Exception as e:
+            logger.error(f"Streaming producer failed: {e}")
+        finally:
+            await queue.put(done)
+
+    producer = asyncio.create_task(_produce())
+
+    batch_size = _STREAM_BATCH_SIZE
+    pending: List[str] = []
+    finished = False
+    try:
+        while not finished:
+            try:
+                token = await asyncio.wait_for(
+                    queue.get(), timeout=_STREAM_FLUSH_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                token = None
+
+            if token is done:
+                finished = True
+            elif token is not None:
+                pending.append(token)
+
+            # Flush on a full batch, a quiet interval, or end of stream
+            if pending and (finished or token is None or len(pending) >= batch_size):
+                yield _chunk({"content": "".join(pending)})
+                pending.clear()
+                batch_size = min(
+                    batch_size * _STREAM_BATCH_GROWTH, _STREAM_MAX_BATCH_SIZE
+                )
+    finally:
+        producer.cancel()
+
+    yield _chunk({}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
 
 
 # ============== Pydantic Models ==============
@@ -111,35 +541,175 @@ class ModelsResponse(BaseModel):
     data: List[ModelInfo]
 
 
+# Matches whitespace-delimited words for token estimation without the
+# intermediate list .split() would allocate
+_TOKEN_RE = re.compile(r"\S+")
+
+# Optional Numba acceleration: when numba is installed, count words as a
+# compiled whitespace-to-word transition loop over the UTF-8 bytes.
+# Everywhere else (including Windows setups without a compiler toolchain)
+# the precompiled-regex scan is used.
+try:
+    from numba import njit
+
+    @njit(cache=True)
+    def _count_words_jit(data: bytes) -> int:
+        count = 0
+        in_word = False
+        for byte in data:
+            is_space = byte == 32 or 9 <= byte <= 13
+            if not is_space and not in_word:
+                count += 1
+            in_word = not is_space
+        return count
+
+    # Pre-warm at import so JIT compilation is not paid on the first request
+    _count_words_jit(b"warm up")
+
+    def _count_words(text: str) -> int:
+        return _count_words_jit(text.encode())
+
+except ImportError:
+    def _count_words(text: str) -> int:
+        return sum(1 for _ in _TOKEN_RE.finditer(text))
+
+
+def _estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate: ~1.3 tokens per whitespace-delimited word.
+    Counting avoids list allocations and stays in integer math (x13 // 10)
+    so large message histories cost no garbage.
+    """
+    return (_count_words(text) * 13) // 10
+
+
+def _parse_chat_request(body: bytes) -> ChatCompletionRequest:
+    """
+    Parse and validate a ChatCompletionRequest straight from raw bytes.
+
+    model_validate_json parses and validates in a single pass over the
+    payload bytes, skipping the intermediate dict FastAPI's default path
+    would materialize before validation. Unlike the earlier
+    construct-without-validation variant this keeps full field validation
+    at essentially the same cost.
+    """
+    try:
+        return ChatCompletionRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+
+# The model catalog is static, so serialize it once at import instead of
+# rebuilding three ModelInfo objects on every poll. OpenWebUI polls
+# /v1/models frequently and does not need a live `created` timestamp.
+_SERVER_START = int(time.time())
+_MODEL_INFOS = {
+    model_id: ModelInfo(
+        id=model_id,
+        object="model",
+        created=_SERVER_START,
+        owned_by="agentic-rag-poc"
+    )
+    for model_id in ("crew-ai-rag", "rag-model", "simple-rag")
+}
+_MODELS_RESPONSE_JSON: bytes = ModelsResponse(
+    object="list", data=list(_MODEL_INFOS.values())
+).model_dump_json().encode()
+
+# Static GET payloads carry cache validators so OpenWebUI and any proxy
+# in front can stop re-fetching them: a 5-minute max-age plus an ETag
+# computed once at import. The conditional-GET middleware below turns a
+# matching If-None-Match into a bodiless 304.
+_CACHE_CONTROL = "public, max-age=300"
+
+
+def _etag_for(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def _static_json_response(body: bytes, etag: str) -> Response:
+    """Serve a precomputed JSON body with its cache validators"""
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"Cache-Control": _CACHE_CONTROL, "ETag": etag}
+    )
+
+
+_ROOT_RESPONSE_JSON: bytes = orjson.dumps({
+    "name": "Agentic RAG API",
+    "version": "1.0.0",
+    "description": "OpenAI-compatible API for document Q&A with CrewAI agents",
+    "endpoints": {
+        "models": "/v1/models",
+        "chat": "/v1/chat/completions",
+        "health": "/health"
+    }
+})
+_ROOT_ETAG = _etag_for(_ROOT_RESPONSE_JSON)
+_MODELS_ETAG = _etag_for(_MODELS_RESPONSE_JSON)
+
+_MODEL_INFO_RESPONSES: Dict[str, tuple] = {}
+for _model_id, _model_info in _MODEL_INFOS.items():
+    _body = _model_info.model_dump_json().encode()
+    _MODEL_INFO_RESPONSES[_model_id] = (_body, _etag_for(_body))
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """Answer conditional GETs on cacheable endpoints with 304"""
+    response = await call_next(request)
+
+    if request.method == "GET":
+        etag = response.headers.get("etag")
+        if etag and etag == request.headers.get("if-none-match"):
+            # Carry over everything attached by inner middleware (CORS,
+            # Vary, Cache-Control) except the headers describing the
+            # body the 304 no longer has
+            headers = {
+                name: value
+                for name, value in response.headers.items()
+                if name not in ("content-length", "content-type", "content-encoding")
+            }
+            return Response(status_code=304, headers=headers)
+
+    return response
+
+
 # ============== API Endpoints ==============
 
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "name": "Agentic RAG API",
-        "version": "1.0.0",
-        "description": "OpenAI-compatible API for document Q&A with CrewAI agents",
-        "endpoints": {
-            "models": "/v1/models",
-            "chat": "/v1/chat/completions",
-            "health": "/health"
-        }
-    }
+    return _static_json_response(_ROOT_RESPONSE_JSON, _ROOT_ETAG)
+
+
+# /health is polled every few seconds by load balancers and OpenWebUI;
+# the serialized body is cached for a second so repeat polls cost nothing
+_HEALTH_TTL = 1.0
+_health_cached = (0.0, b"")
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "components": {
-            "api": "running",
-            "database": "configured",
-            "ollama": settings.ollama.base_url
-        }
-    }
+    """Health check endpoint (response body cached for one second)"""
+    global _health_cached
+    cached_at, body = _health_cached
+
+    if time.monotonic() - cached_at >= _HEALTH_TTL:
+        body = json.dumps({
+            "status": "healthy",
+            "timestamp": datetime.now().isoformat(),
+            "components": {
+                "api": "running",
+                "database": "configured",
+                "ollama": settings.ollama.base_url
+            },
+            "semantic_cache": semantic_cache.stats()
+        }).encode()
+        _health_cached = (time.monotonic(), body)
+
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/v1/models", response_model=ModelsResponse)
@@ -148,82 +718,58 @@ async def list_models():
     List available models.
     Returns models that can be selected in OpenWebUI.
     """
-    models = [
-        ModelInfo(
-            id="crew-ai-rag",
-            object="model",
-            created=int(time.time()),
-            owned_by="agentic-rag-poc"
-        ),
-        ModelInfo(
-            id="rag-model",
-            object="model",
-            created=int(time.time()),
-            owned_by="agentic-rag-poc"
-        ),
-        ModelInfo(
-            id="simple-rag",
-            object="model",
-            created=int(time.time()),
-            owned_by="agentic-rag-poc"
-        )
-    ]
-    
-    return ModelsResponse(object="list", data=models)
+    return _static_json_response(_MODELS_RESPONSE_JSON, _MODELS_ETAG)
 
 
 @app.post("/v1/chat/completions")
-async def chat_completions(request: ChatCompletionRequest):
+async def chat_completions(raw: Request, response: Response):
     """
     OpenAI-compatible chat completions endpoint.
-    
+
     Supports multiple model types:
     - crew-ai-rag: Full multi-agent workflow (research + synthesis)
     - rag-model: Alias for crew-ai-rag
     - simple-rag: Single-agent Q&A mode
     """
+    request = _parse_chat_request(await raw.body())
+
     try:
         start_time = time.time()
         
-        # Extract the user's query from messages
-        user_messages = [m for m in request.messages if m.role == "user"]
-        if not user_messages:
+        # Extract the latest user message; scan from the end so long
+        # histories exit at the first match with no filtered-list copy
+        query = next(
+            (m.content for m in reversed(request.messages) if m.role == "user"),
+            None
+        )
+        if query is None:
             raise HTTPException(status_code=400, detail="No user message provided")
-        
-        query = user_messages[-1].content
         logger.info(f"Processing query: {query[:100]}...")
-        
-        # Determine mode based on model selection
-        use_simple_mode = request.model == "simple-rag"
-        
-        # Create manager with appropriate mode
-        manager = RAGCrewManager(use_simple_mode=use_simple_mode)
-        
-        # Execute query
-        result = manager.query(query)
-        
-        if not result.get("success", False):
-            answer = result.get("answer", "Failed to process query")
-            logger.error(f"Query failed: {result.get('error', 'Unknown error')}")
-        else:
-            answer = result.get("answer", "")
-            
-            # Add source attribution if available
-            sources = result.get("sources", [])
-            if sources:
-                answer += f"\n\n**Sources:** {', '.join(sources)}"
+
+        # Stream token deltas over SSE when the client asks for it
+        if request.stream:
+            return StreamingResponse(
+                _stream_chat_completion(request.model, query),
+                media_type="text/event-stream"
+            )
+
+        answer, sources, prefix_hit = await _resolve_answer(request.model, query)
+        answer = _format_answer(answer, sources)
+
+        # Surface backend prefix-KV reuse so callers can observe hit rate
+        response.headers["X-Prefix-Cache-Hit"] = "true" if prefix_hit else "false"
         
         # Calculate processing time
         processing_time = time.time() - start_time
         logger.info(f"Query processed in {processing_time:.2f}s")
         
         # Estimate token counts (rough estimation)
-        prompt_tokens = sum(len(m.content.split()) * 1.3 for m in request.messages)
-        completion_tokens = len(answer.split()) * 1.3
+        prompt_tokens = sum(_estimate_tokens(m.content) for m in request.messages)
+        completion_tokens = _estimate_tokens(answer)
         
         # Build response
-        response = ChatCompletionResponse(
-            id=f"chatcmpl-{uuid.uuid4().hex[:8]}",
+        completion = ChatCompletionResponse(
+            id=f"chatcmpl-{os.urandom(4).hex()}",
             object="chat.completion",
             created=int(time.time()),
             model=request.model,
@@ -235,56 +781,89 @@ async def chat_completions(request: ChatCompletionRequest):
                 )
             ],
             usage=Usage(
-                prompt_tokens=int(prompt_tokens),
-                completion_tokens=int(completion_tokens),
-                total_tokens=int(prompt_tokens + completion_tokens)
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens
             )
         )
-        
-        return response
-        
+
+        return completion
+
+    except HTTPException:
+        # Deliberate status codes (e.g. 400 for a missing user message)
+        # must not be rewrapped as 500s below
+        raise
     except Exception as e:
         logger.error(f"Error processing chat completion: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Every embeddings call returns an identical placeholder body, so it is
+# serialized to bytes exactly once at import
+_EMBED_RESPONSE_JSON: bytes = orjson.dumps({
+    "object": "list",
+    "data": [
+        {
+            "object": "embedding",
+            "embedding": [0.0] * 768,  # Placeholder
+            "index": 0
+        }
+    ],
+    "model": "nomic-embed-text",
+    "usage": {
+        "prompt_tokens": 0,
+        "total_tokens": 0
+    }
+})
+
+
 @app.post("/v1/embeddings")
-async def create_embeddings(request: Dict[str, Any]):
+async def create_embeddings(request: Request):
     """
     Embeddings endpoint (placeholder for compatibility).
-    The actual embeddings are handled internally by the RAG system.
+    The actual embeddings are handled internally by the RAG system, so
+    the request body is intentionally never parsed and the precomputed
+    body is returned as-is.
     """
-    return {
-        "object": "list",
-        "data": [
-            {
-                "object": "embedding",
-                "embedding": [0.0] * 768,  # Placeholder
-                "index": 0
-            }
-        ],
-        "model": "nomic-embed-text",
-        "usage": {
-            "prompt_tokens": 0,
-            "total_tokens": 0
-        }
-    }
+    return Response(content=_EMBED_RESPONSE_JSON, media_type="application/json")
 
 
 @app.get("/v1/models/{model_id}")
 async def get_model(model_id: str):
     """Get information about a specific model"""
-    valid_models = ["crew-ai-rag", "rag-model", "simple-rag"]
-    
-    if model_id not in valid_models:
+    cached = _MODEL_INFO_RESPONSES.get(model_id)
+
+    if cached is None:
         raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
-    
-    return ModelInfo(
-        id=model_id,
-        object="model",
-        created=int(time.time()),
-        owned_by="agentic-rag-poc"
-    )
+
+    body, etag = cached
+    return _static_json_response(body, etag)
+
+
+@app.post("/v1/cache/clear")
+async def clear_cache():
+    """
+    Clear the exact-match and semantic response caches on all workers.
+    Call this after ingesting or updating documents so stale answers
+    are not served.
+    """
+    global _cache_version_seen
+
+    previous = {
+        "hits": exact_cache.hits,
+        "misses": exact_cache.misses,
+        "entries": len(exact_cache),
+        "semantic_entries": len(semantic_cache._entries)
+    }
+    exact_cache.clear()
+    semantic_cache.clear()
+
+    # Bump the shared version file so sibling workers flush their caches
+    # on their next lookup
+    _CACHE_VERSION_FILE.touch()
+    _cache_version_seen = _cache_version()
+
+    return {"status": "cleared", "previous": previous}
 
 
 # ============== Error Handlers ==============
@@ -307,17 +886,45 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 # ============== Main Entry Point ==============
 
-def run_server(host: str = "0.0.0.0", port: int = 8000):
-    """Run the FastAPI server"""
-    uvicorn.run(app, host=host, port=port)
+def run_server(host: str = "0.0.0.0", port: int = 8000, workers: Optional[int] = None):
+    """
+    Run the FastAPI server.
+
+    Defaults to the API_WORKERS env var, falling back to one worker
+    process per CPU, so memory-limited containers can cap the count
+    without changing their command line. Uses the uvloop event loop and
+    httptools parser where available (neither builds on Windows, which
+    falls back to the stdlib loop and h11). The "api:app" import string
+    is required for workers > 1. Each worker holds its own managers and
+    caches.
+    """
+    if workers is None:
+        workers = int(os.getenv("API_WORKERS", "0")) or os.cpu_count() or 1
+
+    native = sys.platform != "win32"
+    uvicorn.run(
+        "api:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop="uvloop" if native else "asyncio",
+        http="httptools" if native else "h11",
+        log_level="info"
+    )
 
 
 if __name__ == "__main__":
     import argparse
-    
+
     parser = argparse.ArgumentParser(description="Run the Agentic RAG API server")
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     parser.add_argument("--port", type=int, default=8000, help="Port to bind to")
-    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: CPU count)"
+    )
+
     args = parser.parse_args()
-    run_server(host=args.host, port=args.port)
+    run_server(host=args.host, port=args.port, workers=args.workers)
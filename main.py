@@ -57,18 +57,25 @@ def interactive_mode():
             print("\n🔍 Searching documents...\n")
             
             result = manager.query(query)
-            
+
+            # Buffer the whole answer into one write so each response
+            # costs a single syscall instead of several (noticeable
+            # over SSH)
+            lines = []
             if result.get("success"):
-                print("\n" + "="*60)
-                print("📄 ANSWER:")
-                print("="*60)
-                print(result["answer"])
-                
+                lines.append("\n" + "="*60)
+                lines.append("📄 ANSWER:")
+                lines.append("="*60)
+                lines.append(result["answer"])
+
                 if result.get("sources"):
-                    print("\n📚 Sources:", ", ".join(result["sources"]))
+                    lines.append("\n📚 Sources: " + ", ".join(result["sources"]))
             else:
-                print(f"\n❌ Error: {result.get('error', 'Unknown error')}")
-                
+                lines.append(f"\n❌ Error: {result.get('error', 'Unknown error')}")
+
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+
         except KeyboardInterrupt:
             print("\n\n👋 Goodbye!")
             break
@@ -77,11 +84,16 @@ def interactive_mode():
             print(f"\n❌ Error: {e}")
 
 
-def single_query_mode(query: str, simple: bool = False):
-    """Run a single query and exit"""
+def single_query_mode(query: str, simple: bool = False, manager=None):
+    """
+    Run a single query and exit.
+    Batch scripts issuing many queries can pass a pre-built manager to
+    reuse its agent and tool wiring instead of rebuilding it per call.
+    """
     print(f"\n🔍 Processing query: {query}\n")
-    
-    manager = RAGCrewManager(use_simple_mode=simple)
+
+    if manager is None:
+        manager = RAGCrewManager(use_simple_mode=simple)
     result = manager.query(query)
     
     if result.get("success"):
@@ -141,14 +153,21 @@ Examples:
         default=8000,
         help="API server port (default: 8000)"
     )
-    
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="API server worker processes (default: CPU count)"
+    )
+
     args = parser.parse_args()
-    
+
     if args.server:
         # Start API server
         from api import run_server
         print(f"🚀 Starting API server at http://{args.host}:{args.port}")
-        run_server(host=args.host, port=args.port)
+        run_server(host=args.host, port=args.port, workers=args.workers)
     
     elif args.query:
         # Single query mode